@@ -1,38 +1,152 @@
 # agent.py
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import json
-from langchain.tools import StructuredTool
-from langchain_groq import ChatGroq
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+import logging
+import argparse
+import asyncio
+import functools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from langchain.memory import ConversationBufferWindowMemory
-from typing import Optional
+from typing import Any, Hashable, Optional
+from datetime import date
 import sys
 import re
 
+logger = logging.getLogger(__name__)
+
 # Load all environment variables from .env file
 load_dotenv()
 
 # Get the API key from the environment variables
 api_key = os.getenv("GROQ_API_KEY")
 
-# Check if the key was found. If not, print an error and exit.
+# Check if the key was found; ChatGroq will fail on the first request without it
 if not api_key:
-    print("❌ Error: GOOGLE_API_KEY not found. Stopping the script.")
-      # <--- This is the command to stop the script
-
-# This part of the code will ONLY run if the API key was found
-print("✅ API Key loaded successfully. Continuing with the script...")
-print(f"The loaded API key is: {api_key}")
+    logger.warning("GROQ_API_KEY not found; LLM calls will fail until it is set.")
+else:
+    logger.debug("GROQ_API_KEY loaded.")
 
 
 
 # The base URL of your running MCP Server (FastAPI app)
 SERVER_URL = "http://127.0.0.1:8000"
 
+# Default per-request timeout (seconds) for calls to the MCP server
+REQUEST_TIMEOUT = 15
+
+# Per-endpoint timeouts, set above the server's worst case so the agent does not give up first
+TOOL_TIMEOUTS = {
+    "/get_agri_weather_forecast": 45,   # uncached geocode (15s) then forecast (15s)
+    "/get_mandi_prices_today": 90,      # 20s upstream timeout, up to 3 retries with backoff
+    "/get_available_markets": 180,      # Playwright scrapes
+    "/get_dealers_for_market": 180,
+}
+
+# One pooled, keep-alive session shared by every tool so repeated tool calls
+# reuse open connections instead of reconnecting on each invocation
+SESSION = requests.Session()
+SESSION.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    # read=0: a request whose response timed out is never re-sent, so a slow endpoint
+    # (e.g. a dealer scrape) is not started again on the server behind the agent's back
+    max_retries=Retry(total=3, read=0, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# Upper bound on tool calls running at the same time within one agent step
+TOOL_CONCURRENCY_LIMIT = int(os.getenv("TOOL_CONCURRENCY_LIMIT", "8"))
+_tool_semaphore = asyncio.Semaphore(TOOL_CONCURRENCY_LIMIT)
+
+# Upper bound on questions answered at the same time by run_batch (LLM rate limits)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+
+# --- Response Caching ---
+class _TTLStore:
+    """Thread-safe LRU mapping whose entries expire `ttl` seconds after being stored."""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, ttl: Optional[float] = None) -> Any:
+        """Return the cached value for `key`, or None if it is missing or expired."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Successful MCP server response bodies, keyed on (endpoint, params, day). Including the
+# date means "today" data such as mandi prices never outlives midnight; errors
+# are raised before anything is stored, so they are never cached.
+TOOL_CACHE_TTL = 900
+_tool_cache = _TTLStore(ttl=TOOL_CACHE_TTL, maxsize=512)
+
+# Per-endpoint freshness (seconds), by how often the underlying data changes
+TOOL_CACHE_TTLS = {
+    "/get_mandi_prices_today": 3600,      # Agmarknet publishes once a day
+    "/get_agri_weather_forecast": 1800,   # forecasts refresh roughly hourly
+    "/get_available_markets": 86400,
+    "/get_dealers_for_market": 86400,     # scraped dealer listings rarely change
+    "/get_personalised_schemes": 86400,
+}
+
+
+def _fetch(path: str, params: dict, ttl: Optional[float] = None, timeout: Optional[float] = None) -> str:
+    """GET an MCP server endpoint and return its raw JSON body, reusing a fresh cached copy."""
+    key = (path, tuple(sorted(params.items())), date.today())
+    if ttl is None:
+        ttl = TOOL_CACHE_TTLS.get(path, TOOL_CACHE_TTL)
+    if timeout is None:
+        timeout = TOOL_TIMEOUTS.get(path, REQUEST_TIMEOUT)
+    cached = _tool_cache.get(key, ttl)
+    if cached is not None:
+        return cached
+
+    response = SESSION.get(f"{SERVER_URL}{path}", params=params, timeout=timeout)
+    response.raise_for_status()
+    body = response.text
+    _tool_cache.set(key, body)
+    return body
+
+
+def _tool_error(e: Exception) -> str:
+    """Formats a failure as the plain-text observation the LLM sees; no JSON is built on the error path."""
+    return f"Error: {e}"
+
 
 # --- Tool Functions with Descriptions in Docstrings ---
 
@@ -46,46 +160,44 @@ def get_agri_weather_forecast(district: str, crop_name: Optional[str] = None) ->
         if crop_name:
             params["crop_name"] = crop_name
 
-        response = requests.get(f"{SERVER_URL}/get_agri_weather_forecast", params=params)
-        response.raise_for_status()
-        return json.dumps(response.json())
+        # The server already returns JSON, which is all the LLM needs
+        return _fetch("/get_agri_weather_forecast", params)
     except Exception as e:
-        return f"Error: {e}"
+        return _tool_error(e)
 
 def get_mandi_prices_today(state: str, district: str) -> str:
     """Use this tool ONLY for getting official mandi (agricultural market) prices for the CURRENT DAY from government sources in India. It returns a list of commodities with their prices for a given state and district."""
     try:
-        response = requests.get(f"{SERVER_URL}/get_mandi_prices_today", params={"state": state, "district": district})
-        response.raise_for_status()
-        return json.dumps(response.json())
+        return _fetch("/get_mandi_prices_today", {"state": state, "district": district})
     except Exception as e:
-        return f"Error: {e}"
+        return _tool_error(e)
 
 '''
 def get_available_markets(state: str, district: str) -> str:
     """CRITICAL FIRST STEP for finding seed dealers. Use this to get a list of all available markets or areas within a district that have seed dealer information. The user must choose one market from this list before you can use the 'get_dealers_for_market' tool."""
     try:
-        response = requests.get(f"{SERVER_URL}/get_available_markets", params={"state": state, "district": district})
-        response.raise_for_status()
-        return json.dumps(response.json())
+        return _fetch("/get_available_markets", {"state": state, "district": district})
     except Exception as e:
-        return f"Error: {e}"
+        return _tool_error(e)
 
 def get_dealers_for_market(state: str, district: str, market: str) -> str:
     """FINAL STEP for finding seed dealers. Use this tool ONLY AFTER you have already used 'get_available_markets' and the user has selected a specific market from the list. This retrieves the detailed list of seed dealers for that single, specified market."""
     try:
-        response = requests.get(f"{SERVER_URL}/get_dealers_for_market", params={"state": state, "district": district, "market": market})
-        response.raise_for_status()
-        return json.dumps(response.json())
+        return _fetch("/get_dealers_for_market", {"state": state, "district": district, "market": market})
     except Exception as e:
-        return f"Error: {e}"
+        return _tool_error(e)
 '''    
 
+# Digits with an optional decimal part; a bare "[\d.]+" also matched "1.2.3" or "..."
+_NUM_RE = re.compile(r"\d+(?:\.\d+)?")
+
 def _parse_number(value: str, default: float = 0.0) -> float:
     """Extract first number from string, return default if none."""
     if value is None:
         return default
-    match = re.search(r"[\d.]+", str(value))
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUM_RE.search(str(value))
     return float(match.group()) if match else default
 
 def get_personalised_schemes(age: str, gender: Optional[str] = None, land: Optional[str] = None, income: Optional[str] = None) -> str:
@@ -100,11 +212,10 @@ def get_personalised_schemes(age: str, gender: Optional[str] = None, land: Optio
         gender_clean = gender.lower() if gender else None
 
         params = {"age": age_num, "gender": gender_clean, "land": land_num, "income": income_num}
-        response = requests.get(f"{SERVER_URL}/get_personalised_schemes", params=params)
-        response.raise_for_status()
-        return json.dumps(response.json(), ensure_ascii=False, indent=2)
+        # FastAPI already serialises non-ASCII text as-is; compact JSON also costs fewer prompt tokens
+        return _fetch("/get_personalised_schemes", params)
     except Exception as e:
-        return f"Error: {e}"
+        return _tool_error(e)
     
 def get_dealers_for_market(state: str, district: str, market: str) -> str:
     """
@@ -112,9 +223,7 @@ def get_dealers_for_market(state: str, district: str, market: str) -> str:
     """
     try:
         params = {"state": state, "district": district, "market": market}
-        resp = requests.get(f"{SERVER_URL}/get_dealers_for_market", params=params, timeout=180)
-        resp.raise_for_status()
-        result = resp.json()
+        result = json.loads(_fetch("/get_dealers_for_market", params))
 
         # Format output
         top5 = result.get("top5", [])
@@ -138,60 +247,341 @@ def get_dealers_for_market(state: str, district: str, market: str) -> str:
         return "\n".join(msg)
 
     except Exception as e:
-        return f"Error: {e}"
+        return _tool_error(e)
+
+
+# --- Tool Argument Schemas ---
+# Declared once at import so StructuredTool does not have to infer a model from
+# each function signature; validation runs on pydantic-core.
+class WeatherForecastArgs(BaseModel):
+    district: str = Field(description="District name, e.g. 'Kanpur' or 'Ludhiana'.")
+    crop_name: Optional[str] = Field(default=None, description="Optional crop for crop-specific advice, e.g. 'wheat'.")
+
+
+class MandiPricesArgs(BaseModel):
+    state: str = Field(description="Indian state name, e.g. 'Uttar Pradesh'.")
+    district: str = Field(description="District name within the state.")
+
+
+class PersonalisedSchemesArgs(BaseModel):
+    age: str = Field(description="Farmer's age, e.g. '45'.")
+    gender: Optional[str] = Field(default=None, description="Farmer's gender.")
+    land: Optional[str] = Field(default=None, description="Land holding, e.g. '1.5 hectares'.")
+    income: Optional[str] = Field(default=None, description="Annual income, e.g. '200000 INR'.")
+
+
+class DealersForMarketArgs(BaseModel):
+    state: str = Field(description="Indian state name, e.g. 'Uttar Pradesh'.")
+    district: str = Field(description="District name within the state.")
+    market: str = Field(description="Market or area name within the district.")
+
+
+def _as_coroutine(func):
+    """Wrap a blocking tool so the async executor can run it on a worker thread."""
+    @functools.wraps(func)
+    async def _run(**kwargs):
+        async with _tool_semaphore:
+            return await asyncio.to_thread(func, **kwargs)
+    return _run
+
+
+# --- LLM Response Cache ---
+class TTLResponseCache(BaseCache):
+    """
+    In-process LLM cache that returns a stored generation for a repeated prompt.
+    Prompts are compared after case and whitespace normalisation, and entries expire
+    after `ttl` seconds so date-sensitive answers (e.g. mandi prices) are not reused
+    for long. The `llm_string` part of the key already encodes the model, temperature
+    and bound tool schemas, so entries never leak across configurations.
+    """
+
+    def __init__(self, ttl: float = 900, maxsize: int = 256):
+        self._store = _TTLStore(ttl=ttl, maxsize=maxsize)
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> tuple:
+        return " ".join(prompt.casefold().split()), llm_string
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self._store.get(self._key(prompt, llm_string))
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self._store.set(self._key(prompt, llm_string), return_val)
+
+    def clear(self, **kwargs) -> None:
+        self._store.clear()
+
+
+def _approx_token_ids(text: str) -> list:
+    """Rough token count (~4 characters per token), enough to size the summary memory."""
+    return [0] * (len(text) // 4 + 1)
 
-        
-# --- Tool definitions using the robust StructuredTool class ---
-# It automatically infers the name, description, and arguments from the function definitions
-tools = [
-    StructuredTool.from_function(func=get_agri_weather_forecast),
-    StructuredTool.from_function(func=get_mandi_prices_today),
-    StructuredTool.from_function(func=get_personalised_schemes),
-    StructuredTool.from_function(func=get_dealers_for_market),
-]
 
 # --- Agent Setup ---
-# --- Agent Setup ---
-# --- Agent Setup ---
-llm = ChatGroq(   # keep key in .env
-    model="meta-llama/llama-4-scout-17b-16e-instruct",              # Groq model name for Llama 4 Scout
-    temperature=0
-)
+# The system prompt is the stable prefix of every LLM request, so provider-side prompt
+# caching can reuse it across turns and sessions. Never interpolate variables (dates,
+# locations, user details) into it; per-turn context goes at the end of the human
+# input instead, see _with_turn_context(). It must also not contain curly braces,
+# which ChatPromptTemplate would treat as template variables.
+SYSTEM_PROMPT = """You are a helpful and conversational farming assistant for farmers in India.
+
+When asked for data from a tool, you must present the relevant data clearly. If a user asks for a list of daily data, provide it in a table format, with a short summary explanation. The user might also not always give inputs in that case just chat normally with it.
+
+Using tools:
+- Call a tool only when the question needs live data: weather forecasts, today's mandi prices, seed dealers or government schemes. Answer general farming questions from your own knowledge.
+- If a tool needs a district, state or market the user has not given, ask for it instead of guessing.
+- When several independent pieces of data are needed (for example prices and the weather for the same district), request them in the same step.
+- If a tool returns an error or no data, say so plainly and suggest what the user can try next. Never invent prices, forecasts, dealers or schemes.
+
+Presenting results:
+- Weather data is a forecast and not guaranteed; always say so. If the user asks for fewer days than the tool returns, show only the days they asked for.
+- Mandi prices are in rupees per quintal; mention the market and commodity for each price.
+- Keep answers short and practical, use simple language, and reply in the language the user writes in."""
+
+# Every tool the agent can use, with its argument schema
+TOOL_REGISTRY = {
+    "get_agri_weather_forecast": (get_agri_weather_forecast, WeatherForecastArgs),
+    "get_mandi_prices_today": (get_mandi_prices_today, MandiPricesArgs),
+    "get_personalised_schemes": (get_personalised_schemes, PersonalisedSchemesArgs),
+    "get_dealers_for_market": (get_dealers_for_market, DealersForMarketArgs),
+}
+
+# Tool sets selectable with the AGENT_PROFILE environment variable
+AGENT_PROFILES = {
+    "basic": ("get_agri_weather_forecast", "get_mandi_prices_today"),
+    "with_dealers": ("get_agri_weather_forecast", "get_mandi_prices_today", "get_dealers_for_market"),
+    "full": tuple(TOOL_REGISTRY),
+}
+DEFAULT_PROFILE = os.getenv("AGENT_PROFILE", "full")
+
+
+# LangChain, Groq and memory modules are imported here rather than at module top,
+# so `import agent` (tests, notebooks) stays cheap and the REPL prompt comes up sooner.
+@functools.lru_cache(maxsize=None)
+def _tool_for(name: str):
+    """Builds the StructuredTool for a registered tool once; profiles share the instances."""
+    from langchain.tools import StructuredTool
+
+    fn, schema = TOOL_REGISTRY[name]
+    # It automatically infers the name and description from the function definition.
+    # The coroutine lets AgentExecutor.ainvoke run several tool calls from one step concurrently.
+    return StructuredTool.from_function(func=fn, coroutine=_as_coroutine(fn), args_schema=schema)
+
+
+def build_tools(profile: str = DEFAULT_PROFILE) -> list:
+    """Builds the StructuredTool list for the given profile."""
+    if profile not in AGENT_PROFILES:
+        raise ValueError(f"Unknown agent profile '{profile}'. Choose one of: {', '.join(AGENT_PROFILES)}")
+
+    # Tools are sorted by name so the serialized tool definitions are byte-identical on every request.
+    return sorted((_tool_for(name) for name in AGENT_PROFILES[profile]), key=lambda t: t.name)
+
+
+def _new_memory(llm):
+    """
+    Builds the memory object that stores one conversation's history. Recent turns are kept
+    verbatim up to a token budget; older ones are folded into a running summary so the
+    prompt stops growing with every turn. Only the user input and final answer are saved
+    per turn, so raw tool JSON never enters the history.
+    """
+    from langchain.memory import ConversationSummaryBufferMemory
+
+    return ConversationSummaryBufferMemory(
+        llm=llm,
+        max_token_limit=600,   # roughly the last one or two turns verbatim
+        memory_key="chat_history",
+        return_messages=True,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def build_agent(profile: str = DEFAULT_PROFILE):
+    """Builds the LLM, memory and tool-calling agent once per process and returns its AgentExecutor."""
+    from langchain_groq import ChatGroq
+    from langchain.agents import AgentExecutor, create_tool_calling_agent
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+    tools = build_tools(profile)
+
+    llm = ChatGroq(   # keep key in .env
+        model="meta-llama/llama-4-scout-17b-16e-instruct",              # Groq model name for Llama 4 Scout
+        temperature=0,
+        cache=TTLResponseCache(ttl=int(os.getenv("LLM_CACHE_TTL", "900"))),
+        custom_get_token_ids=_approx_token_ids,
+    )
+
+    # The prompt now includes a placeholder for memory.
+    # Order matters for prompt caching: static system prefix -> history -> dynamic human turn.
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{input}"),
+        ("placeholder", "{agent_scratchpad}"),
+    ])
+
+    memory = _new_memory(llm)
+
+    # Create the agent. This binds the tools to the LLM once: their schemas are converted
+    # to the provider's tool format here and reused verbatim on every request, so build
+    # the agent once (build_agent is cached) rather than re-binding tools per turn.
+    agent = create_tool_calling_agent(llm, tools, prompt)
+
+    # Create the Agent Executor, which runs the agent and its tools
+    return AgentExecutor(
+        agent=agent, 
+        tools=tools, 
+        verbose=True, 
+        memory=memory # Pass the memory object to the executor
+    )
+
+
+# Conversation memory per session, so concurrent users of one process never share a
+# history. Sessions idle for longer than SESSION_IDLE_TTL seconds are dropped, oldest first
+# once SESSION_LIMIT is reached.
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "21600"))
+SESSION_LIMIT = int(os.getenv("SESSION_LIMIT", "1000"))
+_session_memories = _TTLStore(ttl=SESSION_IDLE_TTL, maxsize=SESSION_LIMIT)
+
+
+def executor_for_session(session_id: str):
+    """
+    Returns an AgentExecutor bound to the memory of `session_id`, for serving several users
+    from one process. The LLM, tools and agent are shared; only the history is per session.
+    """
+    from langchain.agents import AgentExecutor
 
+    shared = build_agent()
+    memory = _session_memories.get(session_id)
+    if memory is None:
+        memory = _new_memory(shared.memory.llm)
+    _session_memories.set(session_id, memory)   # restarts the idle timer
 
-# The prompt now includes a placeholder for memory
-prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a helpful and conversational farming assistant. When asked for data from a tool, you must present the relevant data clearly. If a user asks for a list of daily data, provide it in a table format, with a short summary explanation. The user might also not always give inputs in that case just chat normally with it."),
-    MessagesPlaceholder(variable_name="chat_history"),
-    ("human", "{input}"),
-    ("placeholder", "{agent_scratchpad}"),
-])
+    return AgentExecutor(agent=shared.agent, tools=shared.tools, verbose=shared.verbose, memory=memory)
 
-# The memory object that stores the conversation history
-memory = ConversationBufferWindowMemory(k=5, memory_key="chat_history", return_messages=True)
 
-# Create the agent
-agent = create_tool_calling_agent(llm, tools, prompt)
+def _with_turn_context(user_input: str) -> str:
+    """Append volatile per-turn context after the user's text, keeping the prompt prefix stable."""
+    return f"{user_input}\n\n(Today's date is {date.today():%B %d, %Y}.)"
+
+
+async def _prewarm(llm) -> None:
+    """Opens the connection to Groq with a one-token request, so the first real turn skips the handshake."""
+    try:
+        await llm.bind(max_tokens=1).ainvoke("ping")
+    except Exception as e:
+        logger.debug("LLM prewarm failed: %s", e)
+
+
+async def _stream_answer(agent_executor, user_input: str) -> None:
+    """
+    Runs one turn and prints the model's text as it is generated. A turn answered from the
+    response cache produces no token events, so the final output is printed instead.
+    """
+    print("🤖 Agent: ", end="", flush=True)
+    streamed, output = False, ""
+    async for event in agent_executor.astream_events({"input": _with_turn_context(user_input)}, version="v2"):
+        if event["event"] == "on_chat_model_stream":
+            text = event["data"]["chunk"].content
+            if isinstance(text, str) and text:
+                print(text, end="", flush=True)
+                streamed = True
+        elif event["event"] == "on_chain_end" and not event["parent_ids"]:
+            output = event["data"]["output"].get("output", "")
+    print("" if streamed else output)
 
-# Create the Agent Executor, which runs the agent and its tools
-agent_executor = AgentExecutor(
-    agent=agent, 
-    tools=tools, 
-    verbose=True, 
-    memory=memory # Pass the memory object to the executor
-)
 
 # --- Interactive Chat Loop ---
-if __name__ == "__main__":
+async def chat_loop():
+    agent_executor = build_agent()
+    # Warm the LLM connection while the user types the first question
+    prewarm = asyncio.create_task(_prewarm(agent_executor.memory.llm))
     print("🤖 Farming Assistant Agent is ready. Type 'quit' or 'exit' to end the session.")
     while True:
-        user_input = input("You: ")
+        user_input = await asyncio.to_thread(input, "You: ")
         
         if user_input.lower() in ["quit", "exit"]:
             print("🤖 Goodbye!")
             break
-            
-        result = agent_executor.invoke({"input": user_input})
-        
-        print(f"🤖 Agent: {result['output']}")
+
+        await _stream_answer(agent_executor, user_input)
+
+    await prewarm
+
+
+
+# --- Batch Mode ---
+async def run_batch(inputs: list, max_concurrency: int = BATCH_CONCURRENCY) -> list:
+    """
+    Answers independent questions concurrently and returns the answers in input order.
+    Each question runs without chat history, so their tool calls and LLM requests can overlap.
+    """
+    from langchain.agents import AgentExecutor
+
+    agent_executor = build_agent()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    batch_executor = AgentExecutor(agent=agent_executor.agent, tools=agent_executor.tools)
+
+    async def _answer(question: str) -> str:
+        async with semaphore:
+            try:
+                result = await batch_executor.ainvoke(
+                    {"input": _with_turn_context(question), "chat_history": []}
+                )
+                return result["output"]
+            except Exception as e:
+                return _tool_error(e)
+
+    return await asyncio.gather(*(_answer(q) for q in inputs))
+
+
+def _read_batch_file(path: str) -> list:
+    """Reads one question per JSON line, either a string or an object with an 'input' key."""
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            questions.append(record["input"] if isinstance(record, dict) else str(record))
+    return questions
+
+
+async def _with_tool_executor(main):
+    """
+    Sizes the loop's default thread pool, which asyncio.to_thread uses for the blocking
+    tools, to the tool concurrency limit plus one thread for the REPL's input().
+    """
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=TOOL_CONCURRENCY_LIMIT + 1, thread_name_prefix="agent-tool")
+    )
+    return await main
+
+
+def _run(main):
+    """Runs a coroutine on uvloop when it is installed, otherwise on the default asyncio loop."""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(_with_tool_executor(main))
+    return uvloop.run(_with_tool_executor(main))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"))
+    parser = argparse.ArgumentParser(description="Farming assistant agent")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE.jsonl",
+        help="answer every question in FILE.jsonl and print the answers as JSON lines",
+    )
+    args = parser.parse_args()
+
+    if args.batch:
+        questions = _read_batch_file(args.batch)
+        answers = _run(run_batch(questions))
+        for question, answer in zip(questions, answers):
+            print(json.dumps({"input": question, "output": answer}, ensure_ascii=False))
+    else:
+        _run(chat_loop())
+
 
@@ -1,15 +1,77 @@
 # crop_service.py
 
+import ast
+import functools
 import json
+import numpy as np
 import pandas as pd
 from typing import Dict
 
+# Syntax a rule's "when" expression may use: comparisons and arithmetic over weather
+# parameters, combined with and/or/not. Anything else is rejected when the KB is loaded.
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Compare, ast.Gt, ast.GtE, ast.Lt,
+    ast.LtE, ast.Eq, ast.NotEq, ast.Name, ast.Load, ast.Constant,
+)
+
+class _ElementwiseLogic(ast.NodeTransformer):
+    """Rewrites and/or/not and chained comparisons into NumPy's element-wise &, |, ~."""
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        expr = node.values[0]
+        for value in node.values[1:]:
+            expr = ast.BinOp(left=expr, op=op, right=value)
+        return expr
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+        return node
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        # a < b < c  ->  (a < b) & (b < c)
+        lefts = [node.left] + node.comparators[:-1]
+        pairs = [ast.Compare(left=l, ops=[op], comparators=[r])
+                 for l, op, r in zip(lefts, node.ops, node.comparators)]
+        expr = pairs[0]
+        for pair in pairs[1:]:
+            expr = ast.BinOp(left=expr, op=ast.BitAnd(), right=pair)
+        return expr
+
+def _compile_rule(rule: dict, allowed_params: set) -> None:
+    """Validates a rule's condition and stores its compiled, vectorized form on the rule."""
+    tree = ast.parse(rule["when"], mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in rule '{rule['when']}'")
+    names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    unknown = names - allowed_params
+    if unknown:
+        raise ValueError(f"Rule '{rule['when']}' uses unknown parameters: {sorted(unknown)}")
+
+    tree = ast.fix_missing_locations(_ElementwiseLogic().visit(tree))
+    rule["_code"] = compile(tree, "<rule>", "eval")
+    rule["_params"] = names
+
+@functools.lru_cache(maxsize=None)
 def _load_crop_rules(filepath: str = "crop_knowledgebase.json") -> Dict:
-    """Helper to load and parse crop rules from the JSON knowledge base."""
+    """Helper to load, compile and index crop rules from the JSON knowledge base (once per file)."""
     try:
         with open(filepath, "r", encoding="utf-8") as f:
             kb = json.load(f)
-        
+
+        allowed_params = set(kb["available_params"])
+        for c in kb["crops"]:
+            for rule in c["rules"]:
+                _compile_rule(rule, allowed_params)
+
         crop_rules = {c["name"].lower(): c["rules"] for c in kb["crops"]}
         for c in kb["crops"]:
             for alias in c.get("aliases", []):
@@ -17,35 +79,42 @@ def _load_crop_rules(filepath: str = "crop_knowledgebase.json") -> Dict:
         return crop_rules
     except FileNotFoundError:
         raise FileNotFoundError(f"Knowledge base file not found at '{filepath}'")
-    except (json.JSONDecodeError, KeyError) as e:
+    except (json.JSONDecodeError, KeyError, SyntaxError) as e:
         raise ValueError(f"Error parsing knowledge base file: {e}") from e
 
-def _generate_recommendation_for_row(row: pd.Series, rules: list) -> str:
-    """Generates a recommendation string for a single day based on crop-specific rules."""
-    recs = []
-    for rule in rules:
-        try:
-            if eval(rule["when"], {}, row.to_dict()):
-                recs.append(f"[{rule['severity'].upper()}] {rule['advisory']}")
-        except Exception:
-            continue
-    return " | ".join(recs) if recs else "Conditions are favorable. Monitor the crop."
+def _evaluate_rule(rule: dict, columns: Dict[str, np.ndarray], n_days: int) -> np.ndarray:
+    """Evaluates a compiled rule over every day at once and returns a boolean mask."""
+    result = eval(rule["_code"], {"__builtins__": {}}, columns)
+    return np.broadcast_to(np.asarray(result, dtype=bool), (n_days,))
 
 def get_crop_recommendation(weather_df: pd.DataFrame, crop_name: str) -> pd.DataFrame:
     """
     Adds crop-specific recommendations to a pre-existing weather DataFrame.
     """
-    CROP_RULES = _load_crop_rules()
-    
+    CROP_RULES = _load_crop_rules()  # parsed and compiled on first use, then shared
+
     crop_ruleset = CROP_RULES.get(crop_name.lower())
     if not crop_ruleset:
         raise ValueError(f"No knowledge base found for crop '{crop_name}'.")
-    
+
     df_with_recs = weather_df.copy()
-    
-    df_with_recs["recommendations"] = df_with_recs.apply(
-        lambda row: _generate_recommendation_for_row(row, crop_ruleset), 
-        axis=1
-    )
-    
+    n_days = len(df_with_recs)
+    columns = {col: df_with_recs[col].to_numpy() for col in df_with_recs.columns}
+
+    # Loop over rules, not days: each rule is evaluated once across the whole forecast
+    # and its advisory is appended to the days where it fires. Rules on parameters the
+    # weather pipeline does not produce are skipped.
+    recs = [[] for _ in range(n_days)]
+    for rule in crop_ruleset:
+        if not rule["_params"] <= columns.keys():
+            continue
+        msg = f"[{rule['severity'].upper()}] {rule['advisory']}"
+        for i in np.flatnonzero(_evaluate_rule(rule, columns, n_days)):
+            recs[i].append(msg)
+
+    df_with_recs["recommendations"] = [
+        " | ".join(day_recs) if day_recs else "Conditions are favorable. Monitor the crop."
+        for day_recs in recs
+    ]
+
     return df_with_recs
@@ -1,10 +1,8 @@
 # main.py
 
-import sys
-sys.dont_write_bytecode = True
-
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
 import pandas as pd
 import numpy as np
 from typing import Optional, List, Dict, Any
@@ -28,6 +26,10 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Compress larger JSON payloads (16-day forecasts, mandi price tables) for clients
+# that send Accept-Encoding: gzip, such as the agent's shared session
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Global executor for running blocking tasks
 executor = concurrent.futures.ThreadPoolExecutor(max_workers=3)
 
@@ -68,7 +70,8 @@ def agri_weather_endpoint(district: str, crop_name: Optional[str] = None):
         numeric_cols = df_essential.select_dtypes(include=np.number).columns
         df_essential.loc[:, numeric_cols] = df_essential[numeric_cols].round(1)
     
-        return df_essential.to_dict(orient="records")
+        # to_dict already yields plain Python values, so skip FastAPI's jsonable_encoder pass
+        return JSONResponse(content=df_essential.to_dict(orient="records"))
 
     except (ValueError, ConnectionError, FileNotFoundError) as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -111,7 +114,7 @@ def mandi_prices_endpoint(state: str, district: str):
         result = get_mandi_prices_today(state=state, district=district)
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
-        return result
+        return JSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An internal server error occurred: {str(e)}")
     
@@ -1,6 +1,15 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
 import requests
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 
 # ---- CONFIG ----
 API_KEY = "579b464db66ec23bdd000001ce8cce7242164a315a8d3069bbb48a27"
@@ -9,10 +18,65 @@ API_KEY = "579b464db66ec23bdd000001ce8cce7242164a315a8d3069bbb48a27"
 RESOURCE_ID = "9ef84268-d588-465a-a308-a864a43d0070"
 BASE_URL = "https://api.data.gov.in/resource/"
 
-def fetch_mandi_data(district: str | None = None, state="Uttar Pradesh", limit=1000, offset=0, arrival_date: str | None = None):
+# Pages are fetched in parallel over one pooled session (gzip is on by default in requests)
+MAX_WORKERS = 8
+TIMEOUT = (3.05, 20)  # (connect, read) seconds
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+
+# Raw API pages are cached on disk for an hour (Agmarknet updates daily), so exploring
+# dates re-reads pages locally instead of downloading them again
+CACHE_DIR = os.getenv("AGMARKNET_CACHE_DIR", ".agmarknet_cache")
+CACHE_TTL = 3600
+
+def _cache_path(params: dict) -> str:
+    """Cache file for one request's parameters (hashed, since they include the API key)."""
+    key = json.dumps(params, sort_keys=True)
+    return os.path.join(CACHE_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+def _read_cache(path: str) -> dict | None:
+    """Return a cached response body if it is younger than CACHE_TTL, else None."""
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_TTL:
+            return None
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+def _write_cache(path: str, body: bytes) -> None:
+    """Store a response body atomically; a failed write only costs a later re-download."""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+# Agmarknet field -> column name used throughout this module
+COLUMN_NAMES = {
+    "state": "State",
+    "district": "District",
+    "market": "Market",
+    "commodity": "Commodity",
+    "variety": "Variety",
+    "grade": "Grade",
+    "arrival_date": "Date",
+    "min_price": "MinPrice",
+    "max_price": "MaxPrice",
+    "modal_price": "ModalPrice"
+}
+PRICE_COLUMNS = ["MinPrice", "MaxPrice", "ModalPrice"]
+# Low-cardinality text columns, dictionary-encoded as categoricals
+CATEGORY_COLUMNS = ["State", "District", "Market", "Commodity", "Variety", "Grade"]
+OUTPUT_COLUMNS = ["Date", "Market", "Commodity", "Variety", "MinPrice", "MaxPrice", "ModalPrice"]
+
+def _fetch_page(district: str | None = None, state="Uttar Pradesh", limit=1000, offset=0, arrival_date: str | None = None) -> tuple[list, int | None]:
     """
-    Fetch mandi data from data.gov.in API for a specific district & state.
-    Returns a pandas DataFrame with cleaned fields.
+    Fetch one page of mandi data from data.gov.in API for a specific district & state.
+    Returns the raw records and the total record count reported by the API, if any.
     """
     url = f"{BASE_URL}{RESOURCE_ID}"
     params = {
@@ -28,43 +92,117 @@ def fetch_mandi_data(district: str | None = None, state="Uttar Pradesh", limit=1
         # API expects dd/mm/YYYY format for arrival_date equality filter
         params["filters[arrival_date]"] = arrival_date
     
-    # Avoid server-side sort that breaks on text fields; sort client-side
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+    cache_path = _cache_path(params)
+    resp_json = _read_cache(cache_path)
+    if resp_json is None:
+        # Avoid server-side sort that breaks on text fields; sort client-side
+        response = SESSION.get(url, params=params, timeout=TIMEOUT)
+        response.raise_for_status()
+        resp_json = response.json()
+        # An empty or error envelope may be transient; caching it would hide the district for an hour
+        if resp_json.get("records"):
+            _write_cache(cache_path, response.content)
     
-    resp_json = response.json()
     data = resp_json.get("records", [])
+    # "count" is the size of this page, not of the result set, so only "total" is used
+    total = resp_json.get("total")
     if not data:
         msg = resp_json.get("message") or resp_json.get("msg") or "No records"
-        total = resp_json.get("total") or resp_json.get("count")
         print(f"API returned no records. message={msg} total={total}")
+    try:
+        total = int(total) or None  # a zero total is as good as none
+    except (TypeError, ValueError):
+        total = None
+    return data, total
+
+
+def fetch_mandi_records(district: str | None = None, state="Uttar Pradesh", limit=1000, offset=0, arrival_date: str | None = None) -> list:
+    """
+    Fetch one page of mandi data from data.gov.in API for a specific district & state.
+    Returns the raw records as a list of dicts.
+    """
+    return _fetch_page(district, state, limit, offset, arrival_date)[0]
+
+
+def _records_to_frame(records: list) -> pd.DataFrame:
+    """
+    Build one cleaned DataFrame from raw mandi records. Call this once on all pages
+    together so column renaming and dtype conversion run a single time.
+    """
+    if not records:
         return pd.DataFrame()
     
-    df = pd.DataFrame(data)
-    
-    # Clean important fields
-    df = df.rename(columns={
-        "state": "State",
-        "district": "District",
-        "market": "Market",
-        "commodity": "Commodity",
-        "variety": "Variety",
-        "grade": "Grade",
-        "arrival_date": "Date",
-        "min_price": "MinPrice",
-        "max_price": "MaxPrice",
-        "modal_price": "ModalPrice"
-    })
+    df = pd.DataFrame(records).rename(columns=COLUMN_NAMES)
     
     # Convert date and price columns
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce", dayfirst=True)
-    df["MinPrice"] = pd.to_numeric(df["MinPrice"], errors="coerce")
-    df["MaxPrice"] = pd.to_numeric(df["MaxPrice"], errors="coerce")
-    df["ModalPrice"] = pd.to_numeric(df["ModalPrice"], errors="coerce")
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce", format="%d/%m/%Y")
+    for col in PRICE_COLUMNS:
+        prices = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")
+        # Prices are quoted in whole rupees: keep them as nullable Int32 (half the bytes of
+        # float64, missing values become <NA>). A fractional price keeps the column as float.
+        if np.array_equal(prices, np.round(prices), equal_nan=True):
+            df[col] = pd.array(prices, dtype="Int32")
+        else:
+            df[col] = prices
+    for col in CATEGORY_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype("category")
     
     return df
 
 
+def fetch_mandi_data(district: str | None = None, state="Uttar Pradesh", limit=1000, offset=0, arrival_date: str | None = None):
+    """
+    Fetch mandi data from data.gov.in API for a specific district & state.
+    Returns a pandas DataFrame with cleaned fields.
+    """
+    return _records_to_frame(fetch_mandi_records(district, state, limit, offset, arrival_date))
+
+
+def _fetch_district_records(district: str, per_page: int = 1000, max_pages: int = 20) -> list:
+    """
+    Fetch up to max_pages pages of raw records for a district. The first page reports the
+    total record count, so the remaining pages are requested concurrently; if the API omits
+    the total, pages are fetched one by one until an empty page.
+    """
+    records, total = _fetch_page(district, limit=per_page, offset=0)
+    if not records:
+        return []
+    print(f"Fetched page 1: {len(records)} records (total: {len(records)})")
+
+    if total is None:
+        for page_num in range(1, max_pages):
+            page = fetch_mandi_records(district, limit=per_page, offset=page_num * per_page)
+            if not page:
+                break
+            records.extend(page)
+            print(f"Fetched page {page_num + 1}: {len(page)} records (total: {len(records)})")
+        return records
+
+    offsets = [page_num * per_page for page_num in range(1, min(max_pages, math.ceil(total / per_page)))]
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(offsets))) as executor:
+            pages = executor.map(lambda offset: fetch_mandi_records(district, limit=per_page, offset=offset), offsets)
+            for page_num, page in enumerate(pages, start=2):
+                records.extend(page)
+                print(f"Fetched page {page_num}: {len(page)} records (total: {len(records)})")
+    return records
+
+
+# District -> (fetched_at, frame of every fetched record). Listing a district's dates and then
+# filtering one of them reuse a single sweep instead of paging through the API twice.
+_district_frames: dict[str, tuple[float, pd.DataFrame]] = {}
+
+def _district_frame(district: str) -> pd.DataFrame:
+    """All records for a district as one cleaned frame, reused for CACHE_TTL seconds."""
+    cached = _district_frames.get(district)
+    if cached and time.time() - cached[0] <= CACHE_TTL:
+        return cached[1]
+    df = _records_to_frame(_fetch_district_records(district))
+    _district_frames[district] = (time.time(), df)
+    return df
+
+
 def get_prices_for_date(district: str, date_value) -> pd.DataFrame:
     """
     Fetch prices for a specific arrival date. date_value can be a datetime/date/str.
@@ -77,75 +215,45 @@ def get_prices_for_date(district: str, date_value) -> pd.DataFrame:
     
     print(f"Searching for date: {date_str}")
     
-    # Fetch multiple pages and filter client-side for the specific date
-    per_page = 1000
-    offset = 0
-    pages: list[pd.DataFrame] = []
-    max_pages = 20
-    total_records = 0
-    
-    for page_num in range(max_pages):
-        page_df = fetch_mandi_data(district, limit=per_page, offset=offset)
-        if page_df.empty:
-            break
-        pages.append(page_df)
-        total_records += len(page_df)
-        offset += per_page
-        print(f"Fetched page {page_num + 1}: {len(page_df)} records (total: {total_records})")
-    
-    if not pages:
-        return pd.DataFrame(columns=["Date", "Market", "Commodity", "Variety", "MinPrice", "MaxPrice", "ModalPrice"])
-    
-    df = pd.concat(pages, ignore_index=True)
+    # Fetch multiple pages (or reuse this run's sweep) and filter client-side for the specific date
+    df = _district_frame(district)
+    if df.empty:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+    
     print(f"Total records fetched: {len(df)}")
     
     # Show unique dates found
-    unique_dates = pd.to_datetime(df["Date"], errors="coerce").dt.date.dropna().unique()
+    unique_dates = df["Date"].dt.date.dropna().unique()
     print(f"Available dates in data: {sorted(unique_dates)}")
     
+    # Dates are parsed from dd/mm/YYYY, so they already sit at midnight: compare directly,
+    # selecting the output columns in the same step instead of normalizing every row
     target = pd.to_datetime(date_str, dayfirst=True).normalize()
-    df_normalized = df.copy()
-    df_normalized["_D"] = pd.to_datetime(df_normalized["Date"], errors="coerce").dt.normalize()
-    filtered = df_normalized[df_normalized["_D"] == target]
+    filtered = df.loc[df["Date"].to_numpy() == target.to_datetime64(), OUTPUT_COLUMNS]
     
     if filtered.empty:
         print(f"No exact match found for {date_str}")
-        return pd.DataFrame(columns=["Date", "Market", "Commodity", "Variety", "MinPrice", "MaxPrice", "ModalPrice"])
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
     
-    return filtered.sort_values(by=["Market", "Commodity"])[["Date", "Market", "Commodity", "Variety", "MinPrice", "MaxPrice", "ModalPrice"]]
+    return filtered.sort_values(by=["Market", "Commodity"])
 
 
 def get_available_dates(district: str) -> list:
     """
     Get list of available dates for a district.
     """
-    per_page = 1000
-    offset = 0
-    pages = []
-    max_pages = 20  # Increased to get more historical data
-    total_records = 0
-    
     print(f"Fetching available dates for {district}...")
     
-    for page_num in range(max_pages):
-        page_df = fetch_mandi_data(district, limit=per_page, offset=offset)
-        if page_df.empty:
-            break
-        pages.append(page_df)
-        total_records += len(page_df)
-        offset += per_page
-        print(f"Page {page_num + 1}: {len(page_df)} records")
-    
-    if not pages:
+    all_df = _district_frame(district)  # up to 20 pages of historical data
+    if all_df.empty:
         return []
     
-    all_df = pd.concat(pages, ignore_index=True)
     print(f"Total records analyzed: {len(all_df)}")
     
     if all_df["Date"].isna().all():
         return []
     
-    dates = pd.to_datetime(all_df["Date"], errors="coerce").dt.date.dropna().unique()
+    dates = all_df["Date"].dt.date.dropna().unique()
     sorted_dates = sorted(dates, reverse=True)
     
     print(f"Found {len(sorted_dates)} unique dates")
@@ -169,16 +277,32 @@ def get_date_range_info(district: str) -> dict:
     }
 
 
+# Formatted CSV rows are flushed to disk in 1 MiB writes instead of the default 8 KiB
+CSV_BUFFER_SIZE = 1 << 20
+
+def _write_csv(df: pd.DataFrame, path: str) -> None:
+    """Write a DataFrame as UTF-8 (with BOM, for Excel) CSV through a large write buffer."""
+    with open(path, "w", encoding="utf-8-sig", newline="", buffering=CSV_BUFFER_SIZE) as f:
+        df.to_csv(f, index=False)
+
+
 def save_csv_safe(df: pd.DataFrame, base_filename: str) -> None:
     """
     Save DataFrame to CSV. If the filename is locked, write to a timestamped file instead.
+    A Parquet copy is written next to the CSV when a parquet engine (pyarrow) is installed.
     """
+    path = base_filename
     try:
-        df.to_csv(base_filename, index=False, encoding="utf-8-sig")
+        _write_csv(df, path)
     except PermissionError:
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        alt = base_filename.replace(".csv", f"_{ts}.csv")
-        df.to_csv(alt, index=False, encoding="utf-8-sig")
+        path = base_filename.replace(".csv", f"_{ts}.csv")
+        _write_csv(df, path)
+
+    try:
+        df.to_parquet(path.replace(".csv", ".parquet"), index=False)
+    except ImportError:
+        pass
 
 
 # ---- Example Usage ----
@@ -246,5 +370,5 @@ if __name__ == "__main__":
         # Show top commodities by price
         print(f"\n🏆 Top 5 commodities by modal price:")
         top_commodities = result_df.nlargest(5, 'ModalPrice')[['Commodity', 'Variety', 'ModalPrice']]
-        for _, row in top_commodities.iterrows():
-            print(f"   {row['Commodity']} ({row['Variety']}): ₹{row['ModalPrice']:,.0f}")
\ No newline at end of file
+        for commodity, variety, modal_price in top_commodities.itertuples(index=False, name=None):
+            print(f"   {commodity} ({variety}): ₹{modal_price:,.0f}")
\ No newline at end of file
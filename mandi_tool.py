@@ -5,6 +5,8 @@ import requests
 import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,6 +16,28 @@ AGMARKNET_API_KEY = os.getenv("AGMARKNET_API_KEY", "579b464db66ec23bdd000001ce8c
 RESOURCE_ID = "9ef84268-d588-465a-a308-a864a43d0070"
 BASE_URL = "https://api.data.gov.in/resource/"
 
+# One keep-alive session for every lookup, so repeat requests skip the TCP/TLS handshake
+# (requests already asks for gzip). Transient gateway errors are retried with backoff.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+))
+
+# Agmarknet record field -> output column, in output order
+RECORD_FIELDS = {
+    "market": "Market",
+    "commodity": "Commodity",
+    "variety": "Variety",
+    "arrival_date": "Date",
+    "min_price": "MinPrice",
+    "max_price": "MaxPrice",
+    "modal_price": "ModalPrice"
+}
+
+# How the API spells "no records" in its compact JSON body
+EMPTY_RECORDS = b'"records":[]'
+
 def get_mandi_prices_today(state: str, district: str) -> dict:
     """
     Fetches mandi price data for the current date for a given state and district.
@@ -36,11 +60,14 @@ def get_mandi_prices_today(state: str, district: str) -> dict:
     }
 
     try:
-        response = requests.get(url, params=params, timeout=20)
+        response = SESSION.get(url, params=params, timeout=20)
         response.raise_for_status()
         
-        resp_json = response.json()
-        data = resp_json.get("records", [])
+        # An empty envelope needs no JSON decode; anything else falls through to the full parse
+        if EMPTY_RECORDS in response.content[:4096]:
+            data = []
+        else:
+            data = response.json().get("records", [])
 
         if not data:
             return {
@@ -48,21 +75,8 @@ def get_mandi_prices_today(state: str, district: str) -> dict:
                 "data": []
             }
 
-        df = pd.DataFrame(data)
-        
-        # Clean and rename columns
-        df = df.rename(columns={
-            "market": "Market",
-            "commodity": "Commodity",
-            "variety": "Variety",
-            "arrival_date": "Date",
-            "min_price": "MinPrice",
-            "max_price": "MaxPrice",
-            "modal_price": "ModalPrice"
-        })
-
-        # Select and reorder essential columns
-        df = df[["Market", "Commodity", "Variety", "Date", "MinPrice", "MaxPrice", "ModalPrice"]]
+        # Build only the essential columns, already renamed and ordered, straight from the records
+        df = pd.DataFrame({col: [record.get(field) for record in data] for field, col in RECORD_FIELDS.items()})
         
         # Convert price columns to numeric, coercing errors
         for col in ["MinPrice", "MaxPrice", "ModalPrice"]:
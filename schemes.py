@@ -1,5 +1,7 @@
 #schemes.py
+import functools
 import json
+import numpy as np
 from typing import List, Dict, Any, Optional
 
 # Load schemes.json once
@@ -7,6 +9,47 @@ with open("schemes.json", "r", encoding="utf-8") as f:
     SCHEMES = json.load(f)
 
 
+def _bounds(key: str, missing: float) -> np.ndarray:
+    """One criteria bound per scheme, with +/-inf where a scheme sets no limit."""
+    return np.array([(s.get("criteria") or {}).get(key, missing) for s in SCHEMES], dtype=float)
+
+
+# Eligibility criteria laid out column-wise (one entry per scheme), built once at import
+MIN_AGE, MAX_AGE = _bounds("min_age", -np.inf), _bounds("max_age", np.inf)
+MIN_LAND, MAX_LAND = _bounds("min_land", -np.inf), _bounds("max_land", np.inf)
+MIN_INCOME, MAX_INCOME = _bounds("min_income", -np.inf), _bounds("max_income", np.inf)
+# Allowed genders per scheme, lowercased; None means any gender
+GENDERS = [
+    frozenset(g.lower() for g in crit["gender"]) if "gender" in crit else None
+    for crit in ((s.get("criteria") or {}) for s in SCHEMES)
+]
+RESULTS = [
+    {"name": s["name"], "benefit": s.get("benefit", "Not specified"), "link": s.get("link", "")}
+    for s in SCHEMES
+]
+
+
+@functools.lru_cache(maxsize=2048)
+def _eligible_indices(age: int, gender: Optional[str], land: Optional[float], income: Optional[float]) -> tuple:
+    """Positions of the schemes a profile qualifies for; memoized, as the result depends only on the profile."""
+    # --- Age check ---
+    eligible = (MIN_AGE <= age) & (age <= MAX_AGE)
+
+    # --- Gender check ---
+    if gender:
+        eligible &= np.array([allowed is None or gender in allowed for allowed in GENDERS], dtype=bool)
+
+    # --- Land check ---
+    if land is not None:
+        eligible &= (MIN_LAND <= land) & (land <= MAX_LAND)
+
+    # --- Income check ---
+    if income is not None:
+        eligible &= (MIN_INCOME <= income) & (income <= MAX_INCOME)
+
+    return tuple(np.flatnonzero(eligible).tolist())
+
+
 def get_personalised_schemes(
     age: int,
     gender: Optional[str] = None,
@@ -17,42 +60,5 @@ def get_personalised_schemes(
     Filters schemes.json based on farmer profile.
     Returns a list of eligible schemes.
     """
-    eligible_schemes = []
-
-    for scheme in SCHEMES:
-        crit = scheme.get("criteria", {})
-        is_eligible = True
-
-        # --- Age check ---
-        if "min_age" in crit and age < crit["min_age"]:
-            is_eligible = False
-        if "max_age" in crit and age > crit["max_age"]:
-            is_eligible = False
-
-        # --- Gender check ---
-        if "gender" in crit:
-            allowed = [g.lower() for g in crit["gender"]]
-            if gender and gender.lower() not in allowed:
-                is_eligible = False
-
-        # --- Land check ---
-        if "max_land" in crit and land is not None and land > crit["max_land"]:
-            is_eligible = False
-        if "min_land" in crit and land is not None and land < crit["min_land"]:
-            is_eligible = False
-
-        # --- Income check ---
-        if "max_income" in crit and income is not None and income > crit["max_income"]:
-            is_eligible = False
-        if "min_income" in crit and income is not None and income < crit["min_income"]:
-            is_eligible = False
-
-        if is_eligible:
-            eligible_schemes.append({
-                "name": scheme["name"],
-                "benefit": scheme.get("benefit", "Not specified"),
-                "link": scheme.get("link", "")
-            })
-
-    return eligible_schemes
-
+    indices = _eligible_indices(age, gender.lower() if gender else None, land, income)
+    return [dict(RESULTS[i]) for i in indices]
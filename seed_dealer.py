@@ -1,26 +1,31 @@
 import asyncio
 import pandas as pd
 from playwright.async_api import async_playwright
-from rapidfuzz import process
+from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
 
 # ---------- Helper for fuzzy matching ----------
 async def normalize_dropdown(page, selector: str, user_value: str) -> str:
     """Normalize user input against available dropdown options using fuzzy matching.
        Returns the VALUE attribute (not the label)."""
-    options = await page.query_selector_all(f"{selector} option")
-    option_map = {}
-    for opt in options:
-        label = (await opt.inner_text()).strip()
-        value = await opt.get_attribute("value")
-        if label and value:
-            option_map[label] = value
+    # All (label, value) pairs in one page round-trip instead of two awaits per option
+    options = await page.evaluate(
+        "sel => [...document.querySelectorAll(sel + ' option')].map(o => [o.innerText.trim(), o.getAttribute('value')])",
+        selector,
+    )
+    option_map = {label: value for label, value in options if label and value}
 
     if not option_map:
         return user_value  # fallback
 
-    # Fuzzy match against labels
-    best_match, score, _ = process.extractOne(user_value, list(option_map.keys()), score_cutoff=60)
-    if best_match:
+    # Fuzzy match against labels, each normalized (case, punctuation) once up front
+    labels = list(option_map)
+    match = process.extractOne(
+        default_process(user_value), [default_process(label) for label in labels],
+        scorer=fuzz.WRatio, processor=None, score_cutoff=60,
+    )
+    if match:
+        best_match, score = labels[match[2]], match[1]
         print(f"Matched '{user_value}' -> '{best_match}' (score {score})")
         return option_map[best_match]  # return the VALUE
     else:
@@ -28,88 +33,131 @@ async def normalize_dropdown(page, selector: str, user_value: str) -> str:
         return user_value
 
 
+# Cell texts the site uses for "no value"
+_EMPTY_CELLS = {"", "-", "nan"}
+
+def _clean_cell(text: str):
+    """Strip a scraped cell, mapping placeholder texts to None."""
+    text = text.strip()
+    return None if text in _EMPTY_CELLS else text
+
+
 # ---------- Scraper ----------
+async def _scrape_with_page(page, state_name: str, district_name: str, market_name: str) -> pd.DataFrame:
+    """Runs one dealer search on an already-open page and returns the dealer table."""
+
+    async def close_popup(timeout: int = 0):
+        """Closes the site's modal if it is showing; waits up to `timeout` ms for it to appear."""
+        try:
+            modal = page.locator("#onloadModal")
+            if timeout:
+                await modal.wait_for(state="visible", timeout=timeout)
+            elif not await modal.is_visible():
+                return
+            close_btn = await page.query_selector(
+                "#onloadModal button.close, #onloadModal .btn-close, .modal .close"
+            )
+            if close_btn:
+                await close_btn.click()
+                await modal.wait_for(state="hidden", timeout=2000)
+                print("Closed popup")
+        except:
+            pass
+
+    async def wait_options_loaded(selector: str):
+        """Waits until a dependent dropdown has options beyond its placeholder."""
+        await page.wait_for_function(
+            "sel => document.querySelectorAll(sel + ' option').length > 1", arg=selector, timeout=10000
+        )
+
+    async def extract_table_data():
+        try:
+            await page.wait_for_selector("table tbody tr", timeout=15000)
+            # Read the whole table in one page round-trip rather than one await per cell
+            data, headers = await page.evaluate(
+                """() => [
+                    [...document.querySelectorAll('table tbody tr')]
+                        .map(tr => [...tr.querySelectorAll('td')].map(td => td.innerText)),
+                    [...document.querySelectorAll('table thead tr th')].map(th => th.innerText),
+                ]"""
+            )
+            return data, headers
+        except Exception as e:
+            print(f"Error extracting table data: {e}")
+            return [], []
+
+    try:
+        print("Opening website...")
+        await page.goto("https://www.napanta.com/seed-dealer", wait_until="domcontentloaded")
+        await close_popup(timeout=3000)  # the modal is shown once, shortly after load
+
+        # --- Select State ---
+        await page.wait_for_selector("#ddlState", timeout=10000)
+        state_val = await normalize_dropdown(page, "#ddlState", state_name)
+        await page.select_option("#ddlState", value=state_val)
+        await wait_options_loaded("#ddlDistrict")
+        await close_popup()
+
+        # --- Select District ---
+        district_val = await normalize_dropdown(page, "#ddlDistrict", district_name)
+        await page.select_option("#ddlDistrict", value=district_val)
+        await wait_options_loaded("#ddlMarket")
+        await close_popup()
+
+        # --- Select Market ---
+        market_val = await normalize_dropdown(page, "#ddlMarket", market_name)
+        await page.select_option("#ddlMarket", value=market_val)
+        await close_popup()
+
+        # --- Click GO button ---
+        go_button = await page.wait_for_selector("button.go-btn", timeout=10000)
+        await go_button.scroll_into_view_if_needed()
+        await go_button.click()
+        await close_popup()
+
+        # --- Extract Data ---
+        data, headers = await extract_table_data()
+        if data:
+            # Strip and blank out placeholder cells while building the rows, in one pass
+            rows = [[_clean_cell(cell) for cell in row] for row in data]
+            return pd.DataFrame(rows, columns=headers, dtype=object)  # keep None, which serializes as null
+        else:
+            print("No data found")
+            return pd.DataFrame()
+
+    except Exception as e:
+        print(f"Scraping failed: {e}")
+        return pd.DataFrame()
+
 async def get_dealers_for_market(state_name: str, district_name: str, market_name: str):
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-
-        async def close_popup():
-            try:
-                await page.wait_for_selector("#onloadModal", timeout=3000)
-                close_btn = await page.query_selector(
-                    "#onloadModal button.close, #onloadModal .btn-close, .modal .close"
-                )
-                if close_btn:
-                    await close_btn.click()
-                    await page.wait_for_timeout(1000)
-                    print("Closed popup")
-            except:
-                pass
-
-        async def extract_table_data():
-            try:
-                await page.wait_for_selector("table", timeout=15000)
-                headers = [await h.inner_text() for h in await page.query_selector_all("table thead tr th")]
-                rows = await page.query_selector_all("table tbody tr")
-                data = []
-                for row in rows:
-                    cols = await row.query_selector_all("td")
-                    data.append([await col.inner_text() for col in cols])
-                return data, headers
-            except Exception as e:
-                print(f"Error extracting table data: {e}")
-                return [], []
-
         try:
-            print("Opening website...")
-            await page.goto("https://www.napanta.com/seed-dealer", wait_until="domcontentloaded")
-            await page.wait_for_timeout(2000)
-            await close_popup()
-
-            # --- Select State ---
-            await page.wait_for_selector("#ddlState", timeout=10000)
-            state_val = await normalize_dropdown(page, "#ddlState", state_name)
-            await page.select_option("#ddlState", value=state_val)
-            await page.wait_for_timeout(2000)
-            await close_popup()
-
-            # --- Select District ---
-            await page.wait_for_selector("#ddlDistrict", timeout=10000)
-            district_val = await normalize_dropdown(page, "#ddlDistrict", district_name)
-            await page.select_option("#ddlDistrict", value=district_val)
-            await page.wait_for_timeout(2000)
-            await close_popup()
-
-            # --- Select Market ---
-            await page.wait_for_selector("#ddlMarket", timeout=10000)
-            market_val = await normalize_dropdown(page, "#ddlMarket", market_name)
-            await page.select_option("#ddlMarket", value=market_val)
-            await page.wait_for_timeout(1000)
-            await close_popup()
-
-            # --- Click GO button ---
-            go_button = await page.wait_for_selector("button.go-btn", timeout=10000)
-            await go_button.scroll_into_view_if_needed()
-            await go_button.click()
-            await page.wait_for_timeout(3000)
-            await close_popup()
-
-            # --- Extract Data ---
-            data, headers = await extract_table_data()
-            if data:
-                df = pd.DataFrame(data, columns=headers)
-                for col in df.columns:
-                    df[col] = df[col].astype(str).str.strip()
-                df.replace({"": None, "-": None, "nan": None}, inplace=True)
-                return df
-            else:
-                print("No data found")
-                return pd.DataFrame()
+            page = await browser.new_page()
+            return await _scrape_with_page(page, state_name, district_name, market_name)
+        finally:
+            await browser.close()
 
-        except Exception as e:
-            print(f"Scraping failed: {e}")
-            return pd.DataFrame()
+async def scrape_many(jobs: list, max_concurrency: int = 4) -> list:
+    """
+    Scrapes several (state, district, market) jobs with one Chromium launch, each in its own
+    browser context, at most max_concurrency at a time. Returns one DataFrame per job, in order.
+    """
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def one(job):
+            async with semaphore:
+                context = await browser.new_context()
+                try:
+                    page = await context.new_page()
+                    return await _scrape_with_page(page, *job)
+                finally:
+                    await context.close()
+
+        try:
+            return await asyncio.gather(*(one(job) for job in jobs))
         finally:
             await browser.close()
 
@@ -118,8 +166,9 @@ async def get_top5_and_csv(state, district, market, filename="dealers_full.csv")
     if df.empty:
         return {"top5": [], "csv": None}
 
-    # Save full CSV
-    df.to_csv(filename, index=False)
+    # Save full CSV through a 1 MiB write buffer rather than the default 8 KiB
+    with open(filename, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+        df.to_csv(f, index=False)
 
     # Return first 5 dealers (dicts)
     top5 = df.head(5).to_dict(orient="records")
@@ -1,94 +1,259 @@
 import asyncio
-import pandas as pd
-from playwright.async_api import async_playwright
+import csv
+import os
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
+
+# Browser contexts scraping (district, area) pairs side by side. Each Chromium tab holds
+# 50-100 MB, so the pool is capped by CPU count and can be lowered with MAX_PAGES.
+WORKERS = max(1, int(os.getenv("MAX_PAGES", min(8, (os.cpu_count() or 1) * 2))))
+# Default for every page action, so a stuck page fails its task instead of holding a worker
+PAGE_TIMEOUT = 15000
+
+OUTPUT_CSV = "uttar_pradesh_dealers.csv"
+HEADERS = [
+    "Serial No", "Type", "District", "Area",
+    "Dealer name", "Mobile No", "Address", "NaPanta Mobile App"
+]
+
+# Request types the scraper never reads. Stylesheets still load: the popup and row
+# visibility checks depend on them.
+BLOCKED_RESOURCES = {"image", "font", "media"}
+
+async def block_heavy_resources(target):
+    """Aborts image/font/media requests on a browser context or page; everything else goes through."""
+    async def handle(route):
+        if route.request.resource_type in BLOCKED_RESOURCES:
+            await route.abort()
+        else:
+            await route.continue_()
+    await target.route("**/*", handle)
+
+async def close_popup(page, timeout=0):
+    """Closes the site's modal if it is showing; waits up to `timeout` ms for it to appear."""
+    try:
+        popup = page.locator("#onloadModal")
+        if timeout:
+            await popup.wait_for(state="visible", timeout=timeout)
+        elif not await popup.is_visible():
+            return
+        close_btn = await page.query_selector("#onloadModal button.close, #onloadModal .btn-close, #onloadModal .close")
+        if close_btn:
+            await close_btn.click()
+            print("Closed popup")
+        else:
+            # Fallback: press Escape
+            await page.keyboard.press("Escape")
+            print("Dismissed popup with Escape")
+        await popup.wait_for(state="hidden", timeout=2000)
+    except:
+        pass
+
+async def option_texts(page, selector):
+    """Labels of a dropdown's options, read in one page round-trip."""
+    return await page.evaluate(
+        "sel => [...document.querySelectorAll(sel + ' option')].map(o => o.innerText)", selector
+    )
+
+async def wait_options_changed(page, selector, before):
+    """Waits until a dependent dropdown has been refilled with options other than `before`."""
+    try:
+        await page.wait_for_function(
+            """([sel, before]) => {
+                const labels = [...document.querySelectorAll(sel + ' option')].map(o => o.innerText);
+                return labels.length > 1 && labels.join('\\n') !== before.join('\\n');
+            }""",
+            arg=[selector, before], timeout=10000,
+        )
+    except PlaywrightTimeoutError:
+        pass  # nothing to list for this choice
+
+async def open_state(page):
+    """Loads the dealer search page and selects Uttar Pradesh."""
+    await page.goto("https://www.napanta.com/seed-dealer", wait_until="domcontentloaded")
+    await page.wait_for_selector("#ddlState")
+
+    # Close popup if it appears on first load; it is shown once, shortly after load
+    await close_popup(page, timeout=3000)
+
+    # Select Uttar Pradesh
+    before = await option_texts(page, "#ddlDistrict")
+    await page.select_option("#ddlState", label="Uttar Pradesh")
+    await wait_options_changed(page, "#ddlDistrict", before)
+
+async def select_district(page, district):
+    before = await option_texts(page, "#ddlMarket")
+    await page.select_option("#ddlDistrict", label=district)
+    await wait_options_changed(page, "#ddlMarket", before)
+    await close_popup(page)
+
+async def list_tasks(page):
+    """Visits each district once and returns every (district, area) pair to scrape."""
+    districts = (await option_texts(page, "#ddlDistrict"))[1:]  # skip first option
+
+    tasks = []
+    for district in districts:
+        print(f"Processing district: {district}")
+        await select_district(page, district)
+
+        # Get all areas for this district
+        tasks.extend((district, area) for area in (await option_texts(page, "#ddlMarket"))[1:])
+    return tasks
+
+async def scrape_area(page, district, area):
+    """Runs the search for one area on a page already showing its district; returns the table rows."""
+    print(f"   Processing area: {district} / {area}")
+    await page.select_option("#ddlMarket", label=area)
+    await close_popup(page)
+
+    # Click GO
+    go_btn = await page.wait_for_selector("button.go-btn", timeout=10000)
+    await go_btn.scroll_into_view_if_needed()
+    # The previous area's rows are replaced on each search: wait for them to go, then for the new ones
+    stale_row = await page.query_selector("table tbody tr")
+    await go_btn.click()
+    try:
+        if stale_row:
+            await stale_row.wait_for_element_state("hidden", timeout=10000)
+        await page.locator("table tbody tr").first.wait_for(state="attached", timeout=10000)
+    except PlaywrightTimeoutError:
+        pass  # no dealers listed for this area
+    await close_popup(page)
+
+    # Extract dealer table
+    try:
+        # Whole table in one page round-trip rather than one await per row and cell. textContent
+        # needs no layout pass, unlike innerText; whitespace is collapsed to match rendered text
+        # (it also includes text hidden by CSS, which this plain table does not use).
+        rows = await page.evaluate(
+            "() => [...document.querySelectorAll('table tbody tr')]"
+            ".map(tr => [...tr.querySelectorAll('td')].map(td => td.textContent.replace(/\\s+/g, ' ').trim()))"
+        )
+        return [row for row in rows if row]
+    except Exception as e:
+        print(f"      No data for {district}-{area}: {e}")
+        return []
+
+class OrderedCsvWriter:
+    """
+    Streams each task's rows to the CSV as soon as every earlier task is done, so the file keeps
+    district/area order, a crash keeps what was already scraped, and only rows of tasks finished
+    ahead of a slower one are held in memory. The file and header are created with the first row.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.writer = None
+        self.pending = {}
+        self.next_index = 0
+        self.count = 0
+
+    def add(self, index, rows):
+        self.pending[index] = rows
+        while self.next_index in self.pending:
+            ready = self.pending.pop(self.next_index)
+            self.next_index += 1
+            if not ready:
+                continue
+            if self.writer is None:
+                self.file = open(self.path, "w", newline="", encoding="utf-8")
+                self.writer = csv.writer(self.file)
+                self.writer.writerow(HEADERS[:len(ready[0])])
+            self.writer.writerows(ready)
+            self.file.flush()
+            self.count += len(ready)
+
+    def close(self):
+        # Tasks that never ran leave gaps; write whatever finished after them before closing
+        while self.pending:
+            self.next_index = min(self.pending)
+            self.add(self.next_index, self.pending.pop(self.next_index))
+        if self.file:
+            self.file.close()
+
+async def reset_page(page):
+    """Reloads the search page for a fresh start; returns False instead of raising if that fails."""
+    try:
+        await open_state(page)
+        return True
+    except Exception as e:
+        print(f"      Could not load the search page: {e}")
+        return False
+
+async def worker(browser, queue, sink):
+    """
+    Pulls (index, district, area) off the queue on its own browser context until it is empty.
+    A failed task is recorded as empty; a worker whose page cannot be reloaded stops and
+    leaves the rest of the queue to the other workers.
+    """
+    context = await browser.new_context()
+    context.set_default_timeout(PAGE_TIMEOUT)
+    await block_heavy_resources(context)
+    try:
+        page = await context.new_page()
+        if not await reset_page(page):
+            return
+        current_district = None
+        while True:
+            try:
+                index, district, area = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            print(f"   [{queue.qsize()} areas queued]")
+            rows = []
+            try:
+                if district != current_district:
+                    await select_district(page, district)
+                    current_district = district
+                rows = await scrape_area(page, district, area)
+            except Exception as e:
+                print(f"      Failed {district}-{area}: {e}")
+                current_district = None
+                if not await reset_page(page):  # start the next task from a fresh page
+                    return
+            finally:
+                # Workers share one event loop, so the writer needs no lock
+                sink.add(index, rows)
+    finally:
+        await context.close()
 
 async def scrape_up_dealers():
+    """Scrapes every Uttar Pradesh dealer into OUTPUT_CSV and returns the number of rows written."""
     async with async_playwright() as p:
+        # One browser for the whole run: the district listing and every worker get their own context
         browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
+        sink = OrderedCsvWriter(OUTPUT_CSV)
+        try:
+            page = await browser.new_page()
+            page.set_default_timeout(PAGE_TIMEOUT)
+            await block_heavy_resources(page)
+            await open_state(page)
+            tasks = await list_tasks(page)
+            await page.close()
 
-        async def close_popup():
-            try:
-                # Wait briefly for popup, if exists
-                popup = await page.query_selector("#onloadModal")
-                if popup:
-                    close_btn = await popup.query_selector("button.close, .btn-close, .close")
-                    if close_btn:
-                        await close_btn.click()
-                        print("Closed popup")
-                        await page.wait_for_timeout(1000)
-                    else:
-                        # Fallback: press Escape
-                        await page.keyboard.press("Escape")
-                        print("Dismissed popup with Escape")
-                        await page.wait_for_timeout(1000)
-            except:
-                pass
-
-        await page.goto("https://www.napanta.com/seed-dealer", wait_until="domcontentloaded")
-        await page.wait_for_selector("#ddlState")
-
-        # Close popup if it appears on first load
-        await close_popup()
-
-        # Select Uttar Pradesh
-        await page.select_option("#ddlState", label="Uttar Pradesh")
-        await page.wait_for_timeout(2000)
-
-        # Get all districts
-        district_options = await page.query_selector_all("#ddlDistrict option")
-        districts = [await d.inner_text() for d in district_options[1:]]  # skip first option
-
-        all_data = []
-
-        for district in districts:
-            print(f"Processing district: {district}")
-            await page.select_option("#ddlDistrict", label=district)
-            await page.wait_for_timeout(2000)
-            await close_popup()
-
-            # Get all areas for this district
-            area_options = await page.query_selector_all("#ddlMarket option")
-            areas = [await a.inner_text() for a in area_options[1:]]
-
-            for area in areas:
-                print(f"   Processing area: {area}")
-                await page.select_option("#ddlMarket", label=area)
-                await close_popup()
-
-                # Click GO
-                go_btn = await page.wait_for_selector("button.go-btn", timeout=10000)
-                await go_btn.scroll_into_view_if_needed()
-                await go_btn.click()
-                await page.wait_for_timeout(3000)
-                await close_popup()
-
-                # Extract dealer table
-                try:
-                    rows = await page.query_selector_all("table tbody tr")
-                    for row in rows:
-                        cols = await row.query_selector_all("td")
-                        data = [await c.inner_text() for c in cols]
-                        if data:
-                            all_data.append(data)
-                except Exception as e:
-                    print(f"      No data for {district}-{area}: {e}")
-
-        await browser.close()
-
-        # Convert to DataFrame
-        if all_data:
-            headers = [
-                "Serial No", "Type", "District", "Area",
-                "Dealer name", "Mobile No", "Address", "NaPanta Mobile App"
-            ]
-            df = pd.DataFrame(all_data, columns=headers[:len(all_data[0])])
-            df.to_csv("uttar_pradesh_dealers.csv", index=False)
-            print(f"\n✅ Saved {len(df)} dealers to uttar_pradesh_dealers.csv")
-            return df
+            # Queue is drained in district order, so a worker usually keeps its district selected
+            queue = asyncio.Queue()
+            for index, (district, area) in enumerate(tasks):
+                queue.put_nowait((index, district, area))
+            n_workers = min(WORKERS, len(tasks))
+            print(f"Scraping {len(tasks)} areas with {n_workers} browser contexts")
+            # Every worker finishes before the sink and browser close; one crash does not stop the rest
+            outcomes = await asyncio.gather(*(worker(browser, queue, sink) for _ in range(n_workers)),
+                                            return_exceptions=True)
+            for outcome in outcomes:
+                if isinstance(outcome, Exception):
+                    print(f"Worker stopped: {outcome}")
+            if not queue.empty():
+                print(f"⚠️ {queue.qsize()} areas were not scraped: no worker could load the search page")
+        finally:
+            sink.close()
+            await browser.close()
+
+        if sink.count:
+            print(f"\n✅ Saved {sink.count} dealers to {OUTPUT_CSV}")
         else:
             print("No data extracted")
-            return pd.DataFrame()
+        return sink.count
 
 
 if __name__ == "__main__":
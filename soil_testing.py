@@ -1,6 +1,8 @@
+import argparse
+import time
 import requests
-import json
 import pandas as pd
+from typing import Optional
 
 url = "https://soilhealth4.dac.gov.in/"
 
@@ -9,6 +11,11 @@ headers = {
     "Accept": "application/json",
 }
 
+# Reused for every query so repeat lookups keep the TLS connection to the
+# soil-health server open instead of renegotiating it per call
+SESSION = requests.Session()
+SESSION.headers.update(headers)
+
 payload = {
     "operationName": "GetTestCenters",
     "variables": {
@@ -16,6 +23,9 @@ payload = {
         # Remove or set district to null to get all districts
         "district": None
     },
+    # Only select fields that flatten_centers() reads: 'district', 'state' and 'region' come
+    # back as whole JSON documents, so every extra field adds bytes to download and decode.
+    # The center's state is taken from region.state, so the top-level 'state' is not requested.
     "query": """
     query GetTestCenters($state: String, $district: String) {
       getTestCenters(state: $state, district: $district) {
@@ -24,137 +34,207 @@ payload = {
         name
         STLdetails {
           phone
-          __typename
         }
-        state
         region
         address
-        __typename
       }
     }
     """
 }
 
-response = requests.post(url, headers=headers, json=payload)
+# Columns of a flattened center row, in output order
+CENTER_COLUMNS = ['Center_Name', 'District', 'State', 'Email', 'Phone', 'Address', 'Region_District', 'Coordinates']
 
-print(f"Status Code: {response.status_code}")
+def flatten_centers(centers: list, district: Optional[str] = None) -> list:
+    """
+    Flatten GraphQL test-center records into table rows in a single pass.
+    If 'district' is given, only centers whose district or region district matches it
+    (case-insensitively, via casefold) are kept, and rejected centers are skipped before any row is built.
+    """
+    target = district.casefold() if district else None
+    rows = []
 
-if response.status_code == 200:
-    data = response.json()
-    centers = data.get('data', {}).get('getTestCenters', [])
-    
-    print(f"Total Soil Testing Centers in Uttar Pradesh: {len(centers)}")
-    
-    # Create DataFrame
-    df_data = []
-    
     for center in centers:
-        # Extract district name
-        district_info = center.get('district', {})
-        if isinstance(district_info, dict):
-            district_name = district_info.get('name', 'Unknown District')
-        else:
-            district_name = str(district_info) if district_info else 'Unknown District'
-        
-        # Extract region information
-        region_info = center.get('region', {})
-        state_name = 'N/A'
-        region_district_name = 'N/A'
-        coordinates = 'N/A'
-        
-        if isinstance(region_info, dict):
-            # State name
-            state_info = region_info.get('state', {})
-            if isinstance(state_info, dict):
-                state_name = state_info.get('name', 'N/A')
-            
-            # Region district name
-            region_district_info = region_info.get('district', {})
-            if isinstance(region_district_info, dict):
-                region_district_name = region_district_info.get('name', 'N/A')
-            
-            # Coordinates
-            geolocation = region_info.get('geolocation', {})
-            if isinstance(geolocation, dict) and 'coordinates' in geolocation:
-                coords = geolocation['coordinates']
-                if len(coords) >= 2:
-                    coordinates = f"{coords[1]}, {coords[0]}"  # lat, lng format
-        
-        # Extract phone
-        phone = 'N/A'
-        if center.get('STLdetails') and center['STLdetails'].get('phone'):
-            phone = center['STLdetails']['phone']
-        
-        # Create row data
-        row_data = {
+        region = center.get('region') or {}
+        district_name = (center.get('district') or {}).get('name', 'Unknown District')
+        region_district_name = (region.get('district') or {}).get('name', 'N/A')
+        if target and target not in (district_name.casefold(), region_district_name.casefold()):
+            continue
+
+        coords = (region.get('geolocation') or {}).get('coordinates') or []
+        rows.append({
             'Center_Name': center.get('name', 'N/A'),
             'District': district_name,
-            'State': state_name,
+            'State': (region.get('state') or {}).get('name', 'N/A'),
             'Email': center.get('email', 'N/A'),
-            'Phone': phone,
+            'Phone': (center.get('STLdetails') or {}).get('phone') or 'N/A',
             'Address': center.get('address', 'N/A'),
             'Region_District': region_district_name,
-            'Coordinates': coordinates
-        }
-        
-        df_data.append(row_data)
+            'Coordinates': f"{coords[1]}, {coords[0]}" if len(coords) >= 2 else 'N/A',  # lat, lng format
+        })
+
+    return rows
+
+
+def fetch_centers() -> list:
+    """Fetch the raw GraphQL test-center records for Uttar Pradesh."""
+    response = SESSION.post(url, json=payload, timeout=30)
+    response.raise_for_status()
+    # No centers: return before decoding the body
+    if b'"getTestCenters":[]' in response.content[:8192]:
+        return []
+    return response.json().get('data', {}).get('getTestCenters', [])
+
+
+# The center list changes rarely: flattened rows and a casefolded district -> rows index
+# are kept for CENTERS_TTL seconds, so filtered lookups are a dict hit, not a fetch and scan
+CENTERS_TTL = 3600
+_centers_cache: tuple[float, list, dict] | None = None
+
+def _indexed_centers() -> tuple[list, dict]:
+    """All flattened center rows, and the rows per casefolded district or region district."""
+    global _centers_cache
+    if _centers_cache and time.time() - _centers_cache[0] <= CENTERS_TTL:
+        return _centers_cache[1], _centers_cache[2]
+
+    rows = flatten_centers(fetch_centers())
+    by_district = {}
+    for row in rows:
+        # A center is listed once under each distinct name it matches, in fetch order
+        for name in {row['District'].casefold(), row['Region_District'].casefold()}:
+            by_district.setdefault(name, []).append(row)
+    _centers_cache = (time.time(), rows, by_district)
+    return rows, by_district
+
+
+def get_soil_testing_centers(district: Optional[str] = None) -> list:
+    """
+    Fetches soil testing centers in Uttar Pradesh, optionally limited to one district.
+    Returns a list of flattened center rows.
+    """
+    rows, by_district = _indexed_centers()
+    if district:
+        return list(by_district.get(district.casefold(), []))
+    return list(rows)
+
+
+def get_many_soil_testing_centers(districts: list) -> dict:
+    """
+    Soil testing centers for several districts: {district: [center rows]}.
+    All districts are served from one fetch of the state's centers, not one request each.
+    """
+    _, by_district = _indexed_centers()
+    return {district: list(by_district.get(district.casefold(), [])) for district in districts}
+
+
+def save_excel(df: pd.DataFrame, path: str) -> None:
+    """
+    Write a DataFrame to .xlsx with openpyxl's write-only workbook, which streams rows
+    straight to the file instead of building and styling every cell as to_excel does.
+    Raises ImportError if openpyxl is not installed.
+    """
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        ws.append(row)
+    wb.save(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch soil testing centers in Uttar Pradesh")
+    parser.add_argument("--excel", action="store_true",
+                        help="also write uttar_pradesh_soil_centers.xlsx (requires openpyxl)")
+    args = parser.parse_args()
+
+    response = SESSION.post(url, json=payload, timeout=30)
+
+    print(f"Status Code: {response.status_code}")
+
+    if response.status_code == 200:
+        data = response.json()
+        centers = data.get('data', {}).get('getTestCenters', [])
     
-    # Create DataFrame
-    df = pd.DataFrame(df_data)
+        print(f"Total Soil Testing Centers in Uttar Pradesh: {len(centers)}")
     
-    # Display summary
-    print("\n" + "="*80)
-    print("DATAFRAME SUMMARY:")
-    print("="*80)
-    print(f"Total Records: {len(df)}")
-    print(f"Total Districts: {df['District'].nunique()}")
-    print(f"\nDistricts covered:")
-    district_counts = df['District'].value_counts()
-    for district, count in district_counts.items():
-        print(f"  {district}: {count} centers")
+        df_data = flatten_centers(centers)
     
-    # Display first few rows
-    print("\n" + "="*80)
-    print("SAMPLE DATA (First 5 rows):")
-    print("="*80)
-    print(df.head().to_string(index=False))
+        # Create DataFrame; known columns skip per-row key inference and survive an empty result
+        df = pd.DataFrame.from_records(df_data, columns=CENTER_COLUMNS)
+        # A few districts repeat across hundreds of rows, so store them dictionary-encoded
+        for col in ['District', 'State', 'Region_District']:
+            df[col] = df[col].astype('category')
     
-    # Save DataFrame to different formats
-    df.to_csv('uttar_pradesh_soil_centers.csv', index=False)
+        # Display summary
+        print("\n" + "="*80)
+        print("DATAFRAME SUMMARY:")
+        print("="*80)
+        print(f"Total Records: {len(df)}")
+        print(f"Total Districts: {df['District'].nunique()}")
+        print(f"\nDistricts covered:")
+        district_counts = df['District'].value_counts()
+        # One write for the whole listing instead of a print per district
+        print("\n".join(f"  {district}: {count} centers" for district, count in district_counts.items()))
     
-    # Try to save Excel file, handle missing openpyxl
-    excel_saved = False
-    try:
-        df.to_excel('uttar_pradesh_soil_centers.xlsx', index=False)
-        excel_saved = True
-    except ImportError:
-        print("Note: openpyxl not installed. Excel file not created.")
-        print("Install with: pip install openpyxl")
+        # Display first few rows
+        print("\n" + "="*80)
+        print("SAMPLE DATA (First 5 rows):")
+        print("="*80)
+        print(df.head().to_string(index=False))
     
-    # Save raw JSON data as well
-    with open('uttar_pradesh_soil_centers_raw.json', 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+        # Save DataFrame to different formats
+        df.to_csv('uttar_pradesh_soil_centers.csv', index=False)
     
-    print(f"\n" + "="*80)
-    print("FILES SAVED:")
-    print("="*80)
-    print("✓ uttar_pradesh_soil_centers.csv - CSV format")
-    if excel_saved:
-        print("✓ uttar_pradesh_soil_centers.xlsx - Excel format")
-    else:
-        print("✗ Excel format - openpyxl module required")
-    print("✓ uttar_pradesh_soil_centers_raw.json - Raw JSON data")
+        # Excel only on request (--excel); handle missing openpyxl
+        excel_saved = False
+        if args.excel:
+            try:
+                save_excel(df, 'uttar_pradesh_soil_centers.xlsx')
+                excel_saved = True
+            except ImportError:
+                print("Note: openpyxl not installed. Excel file not created.")
+                print("Install with: pip install openpyxl")
     
-    # Return DataFrame for further analysis
-    print(f"\nDataFrame shape: {df.shape}")
-    print("DataFrame is ready for analysis!")
+        # Parquet copy for fast, typed reloads; needs a parquet engine such as pyarrow
+        parquet_saved = False
+        try:
+            df.to_parquet('uttar_pradesh_soil_centers.parquet', index=False)
+            parquet_saved = True
+        except ImportError:
+            print("Note: pyarrow not installed. Parquet file not created.")
+            print("Install with: pip install pyarrow")
     
-    # Display DataFrame info
-    print("\n" + "="*80)
-    print("DATAFRAME INFO:")
-    print("="*80)
-    print(df.info())
+        # Save raw JSON data as well: the server's bytes as received, so nothing is re-encoded
+        # (json.dump with indent always runs the pure-Python encoder)
+        with open('uttar_pradesh_soil_centers_raw.json', 'wb') as f:
+            f.write(response.content)
     
-else:
-    print(f"Error: {response.status_code}")
-    print(response.text)
+        print(f"\n" + "="*80)
+        print("FILES SAVED:")
+        print("="*80)
+        print("✓ uttar_pradesh_soil_centers.csv - CSV format")
+        if excel_saved:
+            print("✓ uttar_pradesh_soil_centers.xlsx - Excel format")
+        elif args.excel:
+            print("✗ Excel format - openpyxl module required")
+        if parquet_saved:
+            print("✓ uttar_pradesh_soil_centers.parquet - Parquet format")
+        else:
+            print("✗ Parquet format - pyarrow module required")
+        print("✓ uttar_pradesh_soil_centers_raw.json - Raw JSON data")
+    
+        # Return DataFrame for further analysis
+        print(f"\nDataFrame shape: {df.shape}")
+        print("DataFrame is ready for analysis!")
+    
+        # Display DataFrame info
+        print("\n" + "="*80)
+        print("DATAFRAME INFO:")
+        print("="*80)
+        print(df.info())
+    
+    else:
+        print(f"Error: {response.status_code}")
+        print(response.text)
@@ -1,6 +1,9 @@
 # weather_service.py
 
 import os
+import json
+import threading
+import time
 import requests
 import numpy as np
 import pandas as pd
@@ -10,7 +13,25 @@ from dotenv import load_dotenv
 load_dotenv()
 OWM_API_KEY = os.getenv("OWM_API_KEY")
 
-def _get_coords(district_name: str) -> tuple[float, float]:
+# Shared by the geocoding and forecast calls so repeat lookups reuse the open
+# connection to each host instead of a new TCP/TLS handshake per request
+SESSION = requests.Session()
+
+# District -> coordinates never changes, so geocoding results persist across restarts
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", ".geocache.json")
+_geocode_lock = threading.Lock()
+
+def _load_geocode_cache() -> dict:
+    """Helper to read the on-disk geocoding cache, starting empty if it is missing or corrupt."""
+    try:
+        with open(GEOCODE_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+_geocode_cache = _load_geocode_cache()
+
+def _geocode(district_name: str) -> tuple[float, float]:
     """Helper to get coordinates from district name using OpenWeatherMap Geocoding API."""
     if not OWM_API_KEY:
         raise ValueError("OpenWeatherMap API key (OWM_API_KEY) is not set.")
@@ -18,7 +39,7 @@ def _get_coords(district_name: str) -> tuple[float, float]:
     url = "http://api.openweathermap.org/geo/1.0/direct"
     params = {"q": district_name, "limit": 1, "appid": OWM_API_KEY}
     try:
-        resp = requests.get(url, params=params, timeout=15)
+        resp = SESSION.get(url, params=params, timeout=15)
         resp.raise_for_status()
         results = resp.json()
         if not results:
@@ -27,47 +48,98 @@ def _get_coords(district_name: str) -> tuple[float, float]:
     except requests.RequestException as e:
         raise ConnectionError(f"API request failed for geocoding: {e}") from e
 
-def _classify_agri_flags(row: pd.Series) -> dict:
-    """Helper to classify weather conditions into general agronomic flags."""
-    flags = {}
-    if row["temp_max"] > 38: flags["heat"] = "🔴 Red (Heat stress)"
-    elif row["temp_max"] > 32: flags["heat"] = "🟡 Yellow (Mild stress)"
-    else: flags["heat"] = "🟢 Green (Safe)"
+def _get_coords(district_name: str) -> tuple[float, float]:
+    """Helper to get coordinates for a district, geocoding only names not seen before."""
+    key = district_name.strip().lower()
+    cached = _geocode_cache.get(key)
+    if cached:
+        return cached["lat"], cached["lon"]
+
+    lat, lon = _geocode(district_name)
+    with _geocode_lock:
+        _geocode_cache[key] = {"lat": lat, "lon": lon}
+        try:
+            tmp_path = f"{GEOCODE_CACHE_PATH}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(_geocode_cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, GEOCODE_CACHE_PATH)
+        except OSError:
+            pass  # the in-memory entry still serves this process
+    return lat, lon
+
+# Flag name -> DataFrame column holding that day's classification. The flags are kept as
+# flat string columns rather than a per-day dict column, which pandas can only store as
+# opaque Python objects.
+FLAG_COLUMNS = {"heat": "flag_heat", "cold": "flag_cold", "water": "flag_water", "wind": "flag_wind"}
+
+# Flag -> (source column, Red/Yellow cut points, labels Red/Yellow/Green). Values are negated
+# where higher is worse, so every flag buckets as "below the first cut is Red"; a NaN sorts
+# past both cuts and, as before, comes out Green.
+FLAG_BUCKETS = {
+    "heat": ("temp_max", lambda v: -v, [-38, -32],
+             ["🔴 Red (Heat stress)", "🟡 Yellow (Mild stress)", "🟢 Green (Safe)"]),
+    "cold": ("temp_min", lambda v: v, [5, 10],
+             ["🔴 Red (Frost risk)", "🟡 Yellow (Chill stress)", "🟢 Green (Safe)"]),
+    "water": ("aridity_index", lambda v: v, [0.5, 1],
+              ["🔴 Red (Irrigation needed)", "🟡 Yellow (Monitor)", "🟢 Green (Sufficient)"]),
+    "wind": ("wind_gusts", lambda v: -v, [-60, -40],
+             ["🔴 Red (Lodging risk)", "🟡 Yellow (Caution)", "🟢 Green (Safe)"]),
+}
+
+def _classify_agri_flags(df: pd.DataFrame) -> None:
+    """Helper to classify weather conditions into general agronomic flags, one column per flag.
+
+    Each flag is one np.searchsorted pass over its column into a three-label table.
+    """
+    for flag, (source, orient, cuts, labels) in FLAG_BUCKETS.items():
+        values = orient(df[source].to_numpy(dtype=float))
+        df[FLAG_COLUMNS[flag]] = np.array(labels)[np.searchsorted(cuts, values, side="right")]
 
-    if row["temp_min"] < 5: flags["cold"] = "🔴 Red (Frost risk)"
-    elif row["temp_min"] < 10: flags["cold"] = "🟡 Yellow (Chill stress)"
-    else: flags["cold"] = "🟢 Green (Safe)"
+def _daily_mean(hourly: list, n_days: int) -> np.ndarray:
+    """Helper to average an hourly series into one value per forecast day.
 
-    if row["aridity_index"] < 0.5: flags["water"] = "🔴 Red (Irrigation needed)"
-    elif row["aridity_index"] < 1: flags["water"] = "🟡 Yellow (Monitor)"
-    else: flags["water"] = "🟢 Green (Sufficient)"
+    Open-Meteo returns hourly values on the same local-time grid as the daily ones,
+    starting at 00:00 of the first day, so each day is one row of a (n_days, 24) block.
+    Missing hours are ignored; a day with no hours at all is NaN.
+    """
+    values = np.full(n_days * 24, np.nan)
+    hourly = np.asarray(hourly, dtype=float)[: n_days * 24]
+    values[: len(hourly)] = hourly
+    values = values.reshape(n_days, 24)
+
+    counts = np.count_nonzero(~np.isnan(values), axis=1)
+    sums = np.nansum(values, axis=1)
+    return np.divide(sums, counts, out=np.full(n_days, np.nan), where=counts > 0)
 
-    if row["wind_gusts"] > 60: flags["wind"] = "🔴 Red (Lodging risk)"
-    elif row["wind_gusts"] > 40: flags["wind"] = "🟡 Yellow (Caution)"
-    else: flags["wind"] = "🟢 Green (Safe)"
-    return flags
+# Open-Meteo refreshes its forecast at most hourly, so a district's processed forecast is
+# memoized per clock hour (key: district, hour bucket); older buckets are dropped on insert
+FORECAST_TTL = 3600
+_forecast_cache: dict[tuple[str, int], pd.DataFrame] = {}
+_forecast_lock = threading.Lock()
 
 def get_weather_data(district: str) -> pd.DataFrame:
     """
     Fetches and processes a 16-day weather forecast for a given district.
     This function is crop-agnostic.
     """
+    key = (district.strip().lower(), int(time.time() // FORECAST_TTL))
+    cached = _forecast_cache.get(key)
+    if cached is not None:
+        return cached.copy()  # callers add columns to the frame they get
+
     lat, lon = _get_coords(district)
 
-    url_daily = (f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}"
-                 "&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,wind_speed_10m_max,wind_gusts_10m_max"
-                 "&timezone=Asia/Kolkata&forecast_days=16")
-    url_hourly = (f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}"
-                  "&hourly=relative_humidity_2m&timezone=Asia/Kolkata&forecast_days=16")
+    # Daily and hourly variables come back from a single Open-Meteo call
+    url = (f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}"
+           "&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,wind_speed_10m_max,wind_gusts_10m_max"
+           "&hourly=relative_humidity_2m&timezone=Asia/Kolkata&forecast_days=16")
 
     try:
-        daily_resp = requests.get(url_daily, timeout=15)
-        daily_resp.raise_for_status()
-        daily_data = daily_resp.json().get("daily", {})
-
-        hourly_resp = requests.get(url_hourly, timeout=15)
-        hourly_resp.raise_for_status()
-        hourly_data = hourly_resp.json().get("hourly", {})
+        resp = SESSION.get(url, timeout=15)
+        resp.raise_for_status()
+        forecast = resp.json()
+        daily_data = forecast.get("daily", {})
+        hourly_data = forecast.get("hourly", {})
     except requests.RequestException as e:
         raise ConnectionError(f"Failed to fetch weather data from API: {e}") from e
 
@@ -83,15 +155,25 @@ def get_weather_data(district: str) -> pd.DataFrame:
     if df.empty:
         raise ValueError("Could not construct DataFrame from weather API response.")
 
-    df_humidity = pd.DataFrame({'time': hourly_data.get('time', []), 'humidity': hourly_data.get('relative_humidity_2m', [])})
-    df_humidity["date"] = pd.to_datetime(df_humidity["time"]).dt.strftime("%Y-%m-%d")
-    humidity_daily = df_humidity.groupby("date", as_index=False)["humidity"].mean()
-    df = df.merge(humidity_daily, on="date", how="left")
-    df['humidity'] = df['humidity'].fillna(method='ffill').fillna(method='bfill')
-
-    df["temp"] = (df["temp_min"] + df["temp_max"]) / 2
-    df["et0"] = 0.0023 * (df["temp_max"] - df["temp_min"])**0.5 * (df["temp"] + 17.8)
-    df["aridity_index"] = df["precip_mm"] / (df["et0"] + 0.01)
-    df["flags"] = df.apply(_classify_agri_flags, axis=1)
-
-    return df
+    humidity = _daily_mean(hourly_data.get("relative_humidity_2m", []), len(df))
+    # Only a truncated hourly response leaves days without readings; give those the period mean
+    missing = np.isnan(humidity)
+    if missing.any() and not missing.all():
+        humidity[missing] = np.nanmean(humidity)
+    df["humidity"] = humidity
+
+    temp_max = df["temp_max"].to_numpy(dtype=float)
+    temp_min = df["temp_min"].to_numpy(dtype=float)
+    temp = (temp_min + temp_max) / 2
+    # Hargreaves-style ET0; the clip keeps a reversed min/max pair from producing NaN
+    et0 = 0.0023 * np.sqrt(np.clip(temp_max - temp_min, 0, None)) * (temp + 17.8)
+    df["temp"] = temp
+    df["et0"] = et0
+    df["aridity_index"] = df["precip_mm"].to_numpy(dtype=float) / (et0 + 0.01)
+    _classify_agri_flags(df)
+
+    with _forecast_lock:
+        for stale in [k for k in _forecast_cache if k[1] != key[1]]:
+            del _forecast_cache[stale]
+        _forecast_cache[key] = df
+    return df.copy()